@@ -8,6 +8,9 @@ from urllib.parse import urljoin, urlparse
 import requests
 from bs4 import BeautifulSoup
 
+from ResultCache import memoize_by_text_digest
+from Severity import severity_rank
+
 TRACKER_PATTERNS = {
     "analytics": [r"_ga", r"_gid", r"_gat", r"analytics", r"mixpanel", r"amplitude", r"segment"],
     "advertising": [r"_fbp", r"doubleclick", r"ad[sx]?", r"ttclid", r"gcl_au", r"criteo"],
@@ -15,6 +18,16 @@ TRACKER_PATTERNS = {
     "functional": [r"pref", r"lang", r"theme", r"remember"],
 }
 
+# Anchored at the start, each branch looks ahead for any of its category's patterns,
+# so the first category in TRACKER_PATTERNS order wins, as with per-pattern searches.
+_CATEGORY_RE = re.compile(
+    "|".join(
+        f"(?=.*?(?:{'|'.join(patterns)}))(?P<{category}>)"
+        for category, patterns in TRACKER_PATTERNS.items()
+    ),
+    re.DOTALL,
+)
+
 DISCLOSURE_TERMS = {
     "analytics": ["analytics", "measurement", "google analytics", "mixpanel", "amplitude", "segment"],
     "advertising": ["advertising", "ad network", "targeted ads", "remarketing", "doubleclick", "facebook pixel"],
@@ -39,6 +52,15 @@ CONSENT_BUTTON_PATTERNS = {
         r"necessary\s*only",
     ],
 }
+_CONSENT_BUTTON_RES = {
+    state: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for state, patterns in CONSENT_BUTTON_PATTERNS.items()
+}
+
+
+# One match per header token (never at a separator): group 1 is the cookie name,
+# the rest swallows "=value".
+_COOKIE_TOKEN_RE = re.compile(r"(?=[^\n,;])([^\n,;=]*)[^\n,;]*")
 
 
 ARCHIVE_REPOS = [
@@ -215,12 +237,12 @@ def auto_collect_cookies(site_url: str, consent_state: str) -> dict[str, Any]:
 
             clicked = None
             if consent_state in {"after_accept", "after_reject"}:
-                patterns = CONSENT_BUTTON_PATTERNS[consent_state]
+                patterns = _CONSENT_BUTTON_RES[consent_state]
                 for pattern in patterns:
-                    button = page.get_by_role("button", name=re.compile(pattern, re.IGNORECASE)).first
+                    button = page.get_by_role("button", name=pattern).first
                     if button.is_visible(timeout=1000):
                         button.click(timeout=2000)
-                        clicked = pattern
+                        clicked = pattern.pattern
                         page.wait_for_timeout(1500)
                         break
 
@@ -247,35 +269,33 @@ def parse_observed_cookies(raw_text: str) -> list[str]:
     if not raw_text:
         return []
 
-    tokens = [part.strip() for part in re.split(r"[\n,;]+", raw_text) if part.strip()]
-    names: list[str] = []
-
-    for token in tokens:
-        if "=" in token:
-            token = token.split("=", 1)[0].strip()
-        if token:
-            names.append(token)
-
-    return sorted(set(names), key=str.lower)
+    names = {name.strip() for name in _COOKIE_TOKEN_RE.findall(raw_text)}
+    names.discard("")
+    return sorted(names, key=str.lower)
 
 
 def classify_cookie(cookie_name: str) -> str:
-    lower = cookie_name.lower()
-    for category, patterns in TRACKER_PATTERNS.items():
-        for pattern in patterns:
-            if re.search(pattern, lower):
-                return category
-    return "unknown"
+    match = _CATEGORY_RE.match(cookie_name.lower())
+    return match.lastgroup if match else "unknown"
 
 
-def _policy_disclosures(policy_text: str) -> dict[str, bool]:
-    text = policy_text.lower()
+def _policy_disclosures(lower_text: str) -> dict[str, bool]:
+    # Plain `in` checks on purpose; an Aho-Corasick pass was slower for so few terms.
     disclosed: dict[str, bool] = {}
     for category, terms in DISCLOSURE_TERMS.items():
-        disclosed[category] = any(term in text for term in terms)
+        disclosed[category] = any(term in lower_text for term in terms)
     return disclosed
 
 
+def _issue(severity: str, title: str, detail: str) -> dict[str, Any]:
+    return {
+        "severity": severity,
+        "title": title,
+        "detail": detail,
+    }
+
+
+@memoize_by_text_digest()
 def grade_cookie_truthfulness(
     policy_text: str,
     observed_cookie_text: str,
@@ -291,9 +311,10 @@ def grade_cookie_truthfulness(
     for item in classifications:
         category_counts[item["category"]] += 1
 
-    disclosed = _policy_disclosures(policy_text)
+    lower_policy = policy_text.lower()
+    disclosed = _policy_disclosures(lower_policy)
 
-    issues: list[dict[str, str]] = []
+    issues: list[dict[str, Any]] = []
     score = 100
 
     non_essential_count = category_counts["analytics"] + category_counts["advertising"]
@@ -301,51 +322,51 @@ def grade_cookie_truthfulness(
     if consent_state in {"before_consent", "after_reject"} and non_essential_count > 0:
         score -= min(45, non_essential_count * 12)
         issues.append(
-            {
-                "severity": "high",
-                "title": "Non-essential cookies loaded before consent",
-                "detail": "Analytics/advertising cookies were observed when they should usually be blocked.",
-            }
+            _issue(
+                "high",
+                "Non-essential cookies loaded before consent",
+                "Analytics/advertising cookies were observed when they should usually be blocked.",
+            )
         )
 
     if category_counts["analytics"] > 0 and not disclosed.get("analytics", False):
         score -= 20
         issues.append(
-            {
-                "severity": "high",
-                "title": "Undisclosed analytics tracking",
-                "detail": "Analytics-like cookies were observed but analytics disclosure language is weak or missing.",
-            }
+            _issue(
+                "high",
+                "Undisclosed analytics tracking",
+                "Analytics-like cookies were observed but analytics disclosure language is weak or missing.",
+            )
         )
 
     if category_counts["advertising"] > 0 and not disclosed.get("advertising", False):
         score -= 25
         issues.append(
-            {
-                "severity": "high",
-                "title": "Undisclosed advertising tracking",
-                "detail": "Ad/remarketing-like cookies were observed but advertising disclosure language is weak or missing.",
-            }
+            _issue(
+                "high",
+                "Undisclosed advertising tracking",
+                "Ad/remarketing-like cookies were observed but advertising disclosure language is weak or missing.",
+            )
         )
 
     if category_counts["unknown"] > 3:
         score -= 10
         issues.append(
-            {
-                "severity": "medium",
-                "title": "Many unknown cookies",
-                "detail": "Several cookies could not be classified; manually verify vendor and purpose.",
-            }
+            _issue(
+                "medium",
+                "Many unknown cookies",
+                "Several cookies could not be classified; manually verify vendor and purpose.",
+            )
         )
 
-    if "opt-out" not in policy_text.lower() and "do not sell" not in policy_text.lower():
+    if "opt-out" not in lower_policy and "do not sell" not in lower_policy:
         score -= 8
         issues.append(
-            {
-                "severity": "medium",
-                "title": "Weak opt-out language",
-                "detail": "Policy text does not clearly mention opt-out or Do Not Sell controls.",
-            }
+            _issue(
+                "medium",
+                "Weak opt-out language",
+                "Policy text does not clearly mention opt-out or Do Not Sell controls.",
+            )
         )
 
     score = max(0, min(100, score))
@@ -366,7 +387,7 @@ def grade_cookie_truthfulness(
         grade = "F"
         risk_level = "High"
 
-    issues.sort(key=lambda item: {"high": 0, "medium": 1, "low": 2}.get(item["severity"], 3))
+    issues.sort(key=lambda issue: severity_rank(issue["severity"]))
 
     return {
         "score": score,
@@ -1,10 +1,23 @@
 from __future__ import annotations
 
 import argparse
+import importlib
 import json
 import re
-from dataclasses import dataclass
-from typing import Dict, List
+import threading
+from typing import Dict, List, Tuple
+
+from ResultCache import memoize_by_text_digest
+
+try:
+	ahocorasick = importlib.import_module("ahocorasick")
+except Exception:
+	ahocorasick = None
+
+try:
+	hyperscan = importlib.import_module("hyperscan")
+except Exception:
+	hyperscan = None
 
 
 RULES: Dict[str, Dict[str, List[str]]] = {
@@ -112,26 +125,291 @@ RULES: Dict[str, Dict[str, List[str]]] = {
 }
 
 
-@dataclass
-class MatchResult:
-	term: str
-	count: int
+def _is_whole_word(term: str) -> bool:
+	return re.fullmatch(r"[A-Za-z\-]+", term) is not None
 
 
 def _pattern_for_term(term: str) -> str:
 	escaped = re.escape(term)
 	escaped = escaped.replace(r"\ ", r"\s+")
 	escaped = escaped.replace(r"\,", r"\s*,\s*")
-	if re.fullmatch(r"[A-Za-z\-]+", term):
+	if _is_whole_word(term):
 		return rf"\b{escaped}\b"
 	return escaped
 
 
-def _count_matches(text: str, term: str) -> int:
-	pattern = _pattern_for_term(term)
-	return len(re.findall(pattern, text, flags=re.IGNORECASE))
+_WHITESPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _term_key(term: str) -> str:
+	return _WHITESPACE_RE.sub(" ", term.lower())
+
+
+# Characters that re.IGNORECASE folds onto an ASCII letter but str.lower() does
+# not: "İ" lowers to two characters, "ı" and "ſ" stay as they are.
+_UNLOWERABLE_CHARS = frozenset("İıſ")
+
+
+def _lower_like_ignorecase(text: str) -> str | None:
+	if not _UNLOWERABLE_CHARS.isdisjoint(text):
+		return None
+	return text.lower()
+
+
+_ALL_TERMS: List[str] = [
+	term
+	for subgroups in RULES.values()
+	for terms in subgroups.values()
+	for term in terms
+]
+_TERM_KEYS: Dict[str, str] = {term: _term_key(term) for term in _ALL_TERMS}
+_KEY_GROUPS: Dict[str, str] = {
+	key: f"t{index}" for index, key in enumerate(dict.fromkeys(_TERM_KEYS.values()))
+}
+_GROUP_KEYS: Dict[str, str] = {group: key for key, group in _KEY_GROUPS.items()}
+
+
+def _trie_pattern(terms: List[str]) -> str:
+	trie: Dict[str, object] = {}
+	for term in terms:
+		node = trie
+		for char in _TERM_KEYS[term]:
+			node = node.setdefault(char, {})
+		node[""] = term
+
+	def emit(node: Dict[str, object]) -> str:
+		branches: List[str] = []
+		for char, child in node.items():
+			if char == "":
+				leaf = f"(?P<{_KEY_GROUPS[_TERM_KEYS[child]]}>)"
+				branches.append(leaf + r"\b" if _is_whole_word(child) else leaf)
+			else:
+				branches.append((r"\s+" if char == " " else re.escape(char)) + emit(child))
+		if len(branches) == 1:
+			return branches[0]
+		return "(?:" + "|".join(branches) + ")"
+
+	return emit(trie)
+
+
+_WORD_TERMS: List[str] = [term for term in _ALL_TERMS if _is_whole_word(term)]
+_PHRASE_TERMS: List[str] = [term for term in _ALL_TERMS if not _is_whole_word(term)]
+_WORD_KEYS: List[str] = list(dict.fromkeys(_TERM_KEYS[term] for term in _WORD_TERMS))
+_PHRASE_KEYS: List[str] = list(dict.fromkeys(_TERM_KEYS[term] for term in _PHRASE_TERMS))
+
+def _prefix_free_layers(terms: List[str]) -> List[List[str]]:
+	# A lookahead match reports one branch per start position, so a key that is
+	# a prefix of another (e.g. "sell" / "sell your data") must go in a separate
+	# pattern or the longer term would never be counted.
+	layers: List[List[str]] = []
+	unique_terms = {_TERM_KEYS[term]: term for term in reversed(terms)}
+	for key, term in sorted(unique_terms.items(), key=lambda item: len(item[0])):
+		for layer in layers:
+			if not any(key.startswith(_TERM_KEYS[other]) for other in layer):
+				layer.append(term)
+				break
+		else:
+			layers.append([term])
+	return layers
+
+
+def _layer_pattern(terms: List[str]) -> re.Pattern:
+	branches: List[str] = []
+	word_terms = [term for term in terms if _is_whole_word(term)]
+	phrase_terms = [term for term in terms if not _is_whole_word(term)]
+	if word_terms:
+		branches.append(r"\b" + _trie_pattern(word_terms))
+	if phrase_terms:
+		branches.append(_trie_pattern(phrase_terms))
+	return re.compile("(?=" + "|".join(branches) + ")", re.IGNORECASE)
+
+
+# Lookahead alternations over the terms, factored into a prefix trie so the
+# engine branches on the next character instead of retrying each term. The empty
+# leaf group names the term and marks where its match ends. Current RULES fit in
+# a single layer.
+_TERMS_RES: List[re.Pattern] = [
+	_layer_pattern(layer) for layer in _prefix_free_layers(_ALL_TERMS)
+]
+
+
+def _count_terms_regex(text: str) -> Dict[str, int]:
+	counts: Dict[str, int] = {}
+	next_start: Dict[str, int] = {}
+
+	for pattern in _TERMS_RES:
+		for match in pattern.finditer(text):
+			group = match.lastgroup
+			if match.start() < next_start.get(group, 0):
+				continue
+			counts[group] = counts.get(group, 0) + 1
+			next_start[group] = match.start(group)
+
+	return {_GROUP_KEYS[group]: count for group, count in counts.items()}
+
+
+def _is_word_char(char: str) -> bool:
+	return char.isalnum() or char == "_"
+
+
+def _count_literal(lowered: str, key: str) -> int:
+	# str.find runs CPython's skip-table fastsearch in C; only hits pay for the
+	# Python-level \b check.
+	count = 0
+	length = len(key)
+	last_index = len(lowered)
+	index = lowered.find(key)
+	while index != -1:
+		end = index + length
+		if (index == 0 or not _is_word_char(lowered[index - 1])) and (
+			end == last_index or not _is_word_char(lowered[end])
+		):
+			count += 1
+			index = lowered.find(key, end)
+		else:
+			index = lowered.find(key, index + 1)
+	return count
+
+
+def _count_terms_literal(text: str) -> Dict[str, int] | None:
+	lowered = _lower_like_ignorecase(text)
+	if lowered is None:
+		return None
+
+	# Phrases have no \b anchors, so once whitespace runs are collapsed their
+	# non-overlapping re.findall count is exactly str.count.
+	normalized = _WHITESPACE_RE.sub(" ", lowered)
+	counts: Dict[str, int] = {}
+	for key in _PHRASE_KEYS:
+		count = normalized.count(key)
+		if count:
+			counts[key] = count
+	for key in _WORD_KEYS:
+		count = _count_literal(normalized, key)
+		if count:
+			counts[key] = count
+	return counts
+
+
+_HS_KEYS: List[str] = list(_KEY_GROUPS)
+_HS_LOCAL = threading.local()
+
+# Hyperscan's \b and \s are ASCII-only (UCP mode rejects \b), so characters it
+# classifies differently from re are mapped onto an ASCII stand-in of the same
+# class before scanning. \x1c-\x1f are whitespace to re but not to Hyperscan.
+_HS_REMAP_RE = re.compile(r"[\x1c-\x1f\x80-\U0010ffff]")
+_HS_CASELESS_FOLDS = {"İ": "i", "ı": "i", "ſ": "s", "\u212a": "k"}
+_HS_ASCII_CLASSES: Dict[str, str] = {}
+
+
+def _ascii_class(match: re.Match) -> str:
+	char = match.group()
+	replacement = _HS_ASCII_CLASSES.get(char)
+	if replacement is None:
+		if char in _HS_CASELESS_FOLDS:
+			replacement = _HS_CASELESS_FOLDS[char]
+		elif char.isalnum():
+			replacement = "a"
+		elif char.isspace():
+			replacement = " "
+		else:
+			replacement = "?"
+		_HS_ASCII_CLASSES[char] = replacement
+	return replacement
+
+
+def _build_hyperscan_database():
+	if hyperscan is None:
+		return None
+
+	key_terms = {key: term for term, key in _TERM_KEYS.items()}
+	flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST
+	database = hyperscan.Database()
+	database.compile(
+		expressions=[_pattern_for_term(key_terms[key]).encode("ascii") for key in _HS_KEYS],
+		ids=list(range(len(_HS_KEYS))),
+		elements=len(_HS_KEYS),
+		flags=[flags] * len(_HS_KEYS),
+	)
+	return database
+
+
+_HS_DATABASE = _build_hyperscan_database()
+
+
+def _count_terms_hyperscan(text: str) -> Dict[str, int]:
+	scratch = getattr(_HS_LOCAL, "scratch", None)
+	if scratch is None:
+		scratch = _HS_LOCAL.scratch = hyperscan.Scratch(_HS_DATABASE)
+
+	counts = [0] * len(_HS_KEYS)
+	next_start = [0] * len(_HS_KEYS)
+
+	def on_match(term_id: int, start: int, end: int, flags: int, context: object) -> None:
+		if start >= next_start[term_id]:
+			counts[term_id] += 1
+			next_start[term_id] = end
+
+	ascii_text = _HS_REMAP_RE.sub(_ascii_class, text).encode("ascii")
+	_HS_DATABASE.scan(ascii_text, match_event_handler=on_match, scratch=scratch)
+	return {_HS_KEYS[term_id]: count for term_id, count in enumerate(counts) if count}
+
+
+def _build_automaton():
+	if ahocorasick is None:
+		return None
+
+	automaton = ahocorasick.Automaton()
+	for term in _ALL_TERMS:
+		key = _TERM_KEYS[term]
+		automaton.add_word(key, (key, len(key), _is_whole_word(term)))
+	automaton.make_automaton()
+	return automaton
+
+
+_AUTOMATON = _build_automaton()
+
+
+def _count_terms_automaton(text: str) -> Dict[str, int] | None:
+	lowered = _lower_like_ignorecase(text)
+	if lowered is None:
+		return None
+
+	normalized = _WHITESPACE_RE.sub(" ", lowered)
+	last_index = len(normalized) - 1
+	counts: Dict[str, int] = {}
+	next_start: Dict[str, int] = {}
+
+	for end_index, (key, length, whole_word) in _AUTOMATON.iter(normalized):
+		start_index = end_index - length + 1
+		if start_index < next_start.get(key, 0):
+			continue
+		if whole_word:
+			if start_index > 0 and _is_word_char(normalized[start_index - 1]):
+				continue
+			if end_index < last_index and _is_word_char(normalized[end_index + 1]):
+				continue
+		counts[key] = counts.get(key, 0) + 1
+		next_start[key] = end_index + 1
+
+	return counts
+
+
+def _count_terms(text: str) -> Dict[str, int]:
+	if _HS_DATABASE is not None:
+		return _count_terms_hyperscan(text)
+	if _AUTOMATON is not None:
+		counts = _count_terms_automaton(text)
+		if counts is not None:
+			return counts
+	counts = _count_terms_literal(text)
+	if counts is not None:
+		return counts
+	return _count_terms_regex(text)
 
 
+@memoize_by_text_digest()
 def analyze_policy_text(text: str) -> Dict[str, object]:
 	report: Dict[str, object] = {
 		"summary": {},
@@ -142,33 +420,36 @@ def analyze_policy_text(text: str) -> Dict[str, object]:
 
 	total_hits = 0
 	weasel_hits = 0
+	term_counts = _count_terms(text)
 
 	for category, subgroups in RULES.items():
 		cat_total = 0
-		subgroup_results: Dict[str, List[Dict[str, int]]] = {}
+		subgroup_results: Dict[str, Dict[str, list]] = {}
 
 		for subgroup, terms in subgroups.items():
-			hits: List[MatchResult] = []
+			hits: List[Tuple[str, int]] = []
 			for term in terms:
-				count = _count_matches(text, term)
+				count = term_counts.get(_TERM_KEYS[term], 0)
 				if count > 0:
-					hits.append(MatchResult(term=term, count=count))
+					hits.append((term, count))
 					cat_total += count
 					total_hits += count
 					if category.startswith("5."):
 						weasel_hits += count
 
-			hits.sort(key=lambda item: (-item.count, item.term.lower()))
-			subgroup_results[subgroup] = [
-				{"term": item.term, "count": item.count} for item in hits
-			]
+			hits.sort(key=lambda hit: (-hit[1], hit[0].lower()))
+			subgroup_results[subgroup] = {
+				"terms": [term for term, _ in hits],
+				"counts": [count for _, count in hits],
+			}
 
 		report["categories"][category] = {
 			"total_hits": cat_total,
 			"subgroups": subgroup_results,
 		}
 
-	text_words = max(1, len(re.findall(r"\w+", text)))
+	# split yields one more piece than there are \w+ runs.
+	text_words = max(1, len(_WORD_RE.split(text)) - 1)
 	weasel_density = (weasel_hits / text_words) * 100
 
 	risk_score = 0
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import copy
+import functools
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+def _text_digest(arguments: dict[str, Any]) -> bytes:
+    hasher = hashlib.blake2b(digest_size=16)
+    for name, value in arguments.items():
+        if not isinstance(value, str):
+            raise TypeError(f"memoize_by_text_digest only caches str arguments; {name!r} is {type(value).__name__}")
+        encoded = value.encode("utf-8", "surrogatepass")
+        hasher.update(len(encoded).to_bytes(8, "little"))
+        hasher.update(encoded)
+    return hasher.digest()
+
+
+def memoize_by_text_digest(maxsize: int = 128) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    # For functions whose arguments are all str; anything else raises TypeError.
+    # Keys are 16-byte digests, so cached policy texts are not pinned in memory.
+    # Results are deep-copied in and out so callers cannot mutate a cached report.
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        signature = inspect.signature(func)
+        cache: OrderedDict[bytes, Any] = OrderedDict()
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args: str, **kwargs: str) -> Any:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = _text_digest(bound.arguments)
+
+            with lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    return copy.deepcopy(cache[key])
+
+            result = func(*args, **kwargs)
+
+            with lock:
+                cache[key] = copy.deepcopy(result)
+                if len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return result
+
+        def cache_clear() -> None:
+            with lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
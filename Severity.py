@@ -0,0 +1,5 @@
+SEVERITY_RANKS = {"high": 0, "medium": 1, "low": 2}
+
+
+def severity_rank(level: str) -> int:
+    return SEVERITY_RANKS.get(level, len(SEVERITY_RANKS))
@@ -6,8 +6,10 @@ import importlib
 import json
 import os
 import re
+from functools import lru_cache
 from urllib.parse import urlparse
 from dotenv import load_dotenv
+from Severity import severity_rank
 
 app = Flask(__name__)
 
@@ -17,6 +19,8 @@ MODEL_CANDIDATES = [
     "gemini-1.5-flash",
 ]
 
+BULLET_PREFIX_RE = re.compile(r"^[-*•\s]+")
+
 KNOWN_ENTITY_HINTS = {
     "x.com": "X (formerly Twitter, twitter.com)",
     "twitter.com": "X (formerly Twitter)",
@@ -227,7 +231,7 @@ def _parse_breach_snapshot(snapshot_text: str) -> tuple[list[dict], str, list[st
                 synopsis = line.split(":", 1)[1].strip() if ":" in line else ""
                 continue
 
-            cleaned_line = re.sub(r"^[-*•\s]+", "", line).strip()
+            cleaned_line = BULLET_PREFIX_RE.sub("", line).strip()
             if not cleaned_line or cleaned_line in {"{", "}"}:
                 continue
 
@@ -259,10 +263,6 @@ def _parse_breach_snapshot(snapshot_text: str) -> tuple[list[dict], str, list[st
     return incidents, synopsis, sources, grade, risk_level
 
 
-def _severity_rank(level: str) -> int:
-    return {"high": 0, "medium": 1, "low": 2}.get(level, 3)
-
-
 def _flaw_reason(category_name: str, subgroup_name: str, term: str) -> str:
     if category_name.startswith("5."):
         return "Vague promise with legal wiggle room."
@@ -281,17 +281,15 @@ def _flaw_reason(category_name: str, subgroup_name: str, term: str) -> str:
     return "Potential privacy risk indicator term."
 
 
-def _extract_flaws(report: dict) -> list[dict]:
+def _extract_flaws(report: dict) -> tuple[list[dict], frozenset[str]]:
     flaws: list[dict] = []
+    dangerous_terms: set[str] = set()
     categories = report.get("categories", {})
 
     for category_name, category_data in categories.items():
         subgroups = category_data.get("subgroups", {})
         for subgroup_name, hits in subgroups.items():
-            for hit in hits:
-                term = hit.get("term", "")
-                count = hit.get("count", 0)
-
+            for term, count in zip(hits.get("terms", []), hits.get("counts", [])):
                 severity = "medium"
                 if category_name.startswith("5."):
                     severity = "high"
@@ -302,6 +300,9 @@ def _extract_flaws(report: dict) -> list[dict]:
                 elif category_name.startswith("4.") and subgroup_name == "Timelines":
                     severity = "low"
 
+                if severity in {"high", "medium"}:
+                    dangerous_terms.add(term)
+
                 flaws.append(
                     {
                         "category": category_name,
@@ -313,14 +314,8 @@ def _extract_flaws(report: dict) -> list[dict]:
                     }
                 )
 
-    flaws.sort(
-        key=lambda item: (
-            _severity_rank(item["severity"]),
-            -item["count"],
-            item["term"].lower(),
-        )
-    )
-    return flaws
+    flaws.sort(key=lambda flaw: (severity_rank(flaw["severity"]), -flaw["count"], flaw["term"].lower()))
+    return flaws, frozenset(dangerous_terms)
 
 
 def _privacy_grade(score: int) -> str:
@@ -375,34 +370,27 @@ def _pattern_for_term(term: str) -> str:
     return escaped
 
 
-def _highlight_dangers(text: str, flaws: list[dict]) -> Markup:
-    dangerous_terms = {
-        flaw["term"]
-        for flaw in flaws
-        if flaw.get("severity") in {"high", "medium"}
-    }
-    if not dangerous_terms:
-        return Markup(f"<pre class='policy-text'>{escape(text)}</pre>")
-
+@lru_cache(maxsize=128)
+def _danger_pattern(dangerous_terms: frozenset[str]) -> re.Pattern:
+    # Matched against already-escaped text, so terms are escaped the same way
+    # (e.g. the apostrophe in "don't" becomes &#39;).
     patterns = sorted(
-        (_pattern_for_term(term) for term in dangerous_terms),
+        (_pattern_for_term(str(escape(term))) for term in dangerous_terms),
         key=len,
         reverse=True,
     )
-    combined_pattern = re.compile("(" + "|".join(patterns) + ")", flags=re.IGNORECASE)
-
-    parts: list[str] = []
-    cursor = 0
-    for match in combined_pattern.finditer(text):
-        start, end = match.span()
-        if start > cursor:
-            parts.append(str(escape(text[cursor:start])))
-        parts.append(f"<mark class='danger-mark'>{escape(text[start:end])}</mark>")
-        cursor = end
-    if cursor < len(text):
-        parts.append(str(escape(text[cursor:])))
-
-    highlighted = "".join(parts)
+    return re.compile("(?:" + "|".join(patterns) + ")", flags=re.IGNORECASE)
+
+
+def _highlight_dangers(text: str, dangerous_terms: frozenset[str]) -> Markup:
+    escaped = str(escape(text))
+    if not dangerous_terms:
+        return Markup(f"<pre class='policy-text'>{escaped}</pre>")
+
+    highlighted = _danger_pattern(dangerous_terms).sub(
+        r"<mark class='danger-mark'>\g<0></mark>",
+        escaped,
+    )
     return Markup(f"<pre class='policy-text'>{highlighted}</pre>")
 
 
@@ -507,8 +495,8 @@ def compare_cookie_audit():
                 policy_source_label = policy_fetch.get("source_label", "")
 
                 report = analyze_policy_text(policy_text)
-                flaws = _extract_flaws(report)
-                highlighted_text = _highlight_dangers(policy_text, flaws)
+                flaws, dangerous_terms = _extract_flaws(report)
+                highlighted_text = _highlight_dangers(policy_text, dangerous_terms)
                 grade = _privacy_grade(report.get("risk_score", 0))
             else:
                 policy_error = policy_fetch.get("error", "Policy fetch failed.")
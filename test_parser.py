@@ -0,0 +1,105 @@
+import random
+import re
+import unittest
+
+import Parser
+
+
+def _expected_counts(text):
+	counts = {}
+	for term in Parser._ALL_TERMS:
+		count = len(re.findall(Parser._pattern_for_term(term), text, flags=re.IGNORECASE))
+		if count:
+			counts[Parser._TERM_KEYS[term]] = count
+	return counts
+
+
+def _available_counters():
+	counters = [Parser._count_terms_literal, Parser._count_terms_regex]
+	if Parser._HS_DATABASE is not None:
+		counters.append(Parser._count_terms_hyperscan)
+	if Parser._AUTOMATON is not None:
+		counters.append(Parser._count_terms_automaton)
+	return counters
+
+
+def _random_policy(rng):
+	fillers = [
+		"the", "we", "data", "your", "and", "cookiesettings", "collected", "re-collect",
+		"_share", "sell2", "\n", ",", ".", "  ", "\t", "\xa0", "transfers", "retention",
+		"opt-outs", "as", "-", "(", ")", "’", "“", "café", "©", "ı", "ſ", "İ", "\u212a", "\x1c",
+	]
+
+	def variant(term):
+		term = "".join(char.upper() if rng.random() < 0.3 else char for char in term)
+		return term.replace(" ", rng.choice([" ", "  ", "\n", " \t ", "\xa0"]))
+
+	words = [
+		variant(rng.choice(Parser._ALL_TERMS)) if rng.random() < 0.3 else rng.choice(fillers)
+		for _ in range(rng.randint(0, 300))
+	]
+	return rng.choice([" ", " ", " ", "", "-", "_"]).join(words)
+
+
+class CountTermsTest(unittest.TestCase):
+	def assert_counters_agree(self, text):
+		expected = _expected_counts(text)
+		for counter in _available_counters():
+			counts = counter(text)
+			if counts is None:
+				continue
+			self.assertEqual(counts, expected, f"{counter.__name__} on {text[:80]!r}")
+
+	def test_rules_sample(self):
+		terms = Parser._ALL_TERMS
+		self.assert_counters_agree(
+			"\n".join(
+				[
+					" ".join(terms),
+					"  ".join(term.upper() for term in terms),
+					"-".join(terms),
+					"".join(terms),
+					" ".join(f"{first} {second}" for first, second in zip(terms, terms[1:])),
+				]
+			)
+		)
+
+	def test_randomized_policies(self):
+		rng = random.Random(1)
+		for _ in range(200):
+			self.assert_counters_agree(_random_policy(rng))
+
+	def assert_folds_like_ignorecase(self, counter):
+		self.assertEqual(_expected_counts("prıvacy choıces"), {"privacy choices": 1})
+		self.assertEqual(_expected_counts("we ſell data")["sell"], 1)
+		for text in ("prıvacy choıces", "we ſell data", "İP address", "ſhare ıt", "\u212aeep"):
+			counts = counter(text)
+			if counts is not None:
+				self.assertEqual(counts, _expected_counts(text), f"{counter.__name__} on {text!r}")
+
+	def test_automaton_folds_like_ignorecase(self):
+		if Parser._AUTOMATON is None:
+			self.skipTest("pyahocorasick is not installed")
+		self.assert_folds_like_ignorecase(Parser._count_terms_automaton)
+
+	def test_hyperscan_folds_like_ignorecase(self):
+		if Parser._HS_DATABASE is None:
+			self.skipTest("hyperscan is not installed")
+		self.assert_folds_like_ignorecase(Parser._count_terms_hyperscan)
+		self.assertEqual(Parser._count_terms_hyperscan("café’s «sell»\xa0data\x1cshare"), {"sell": 1, "share": 1})
+
+	def test_literal_folds_like_ignorecase(self):
+		self.assert_folds_like_ignorecase(Parser._count_terms_literal)
+
+	def test_count_terms_folds_like_ignorecase(self):
+		self.assertEqual(Parser._count_terms("prıvacy choıces"), {"privacy choices": 1})
+		self.assertEqual(Parser._count_terms("we ſell data")["sell"], 1)
+
+	def test_analyze_policy_text_uses_counts(self):
+		report = Parser.analyze_policy_text("We may share your IP address with third parties.")
+		subgroups = report["categories"]["2. Data Sharing (External Relationships)"]["subgroups"]
+		self.assertEqual(subgroups["The Actions"], {"terms": ["share"], "counts": [1]})
+
+
+if __name__ == "__main__":
+	unittest.main()